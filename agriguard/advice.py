@@ -1,63 +1,462 @@
 """Generate agronomic advice from forecast metrics using Hugging Face Inference API."""
 
+import hashlib
 import os
 import re
+from collections import OrderedDict
+from collections.abc import Iterator, Sequence
+from typing import TYPE_CHECKING, Literal
 
-from huggingface_hub import InferenceClient
+if TYPE_CHECKING:
+    import diskcache
+    from huggingface_hub import InferenceClient
+
+# Cheapest model first; escalate only when its answer fails _acceptable()
+_MODEL_CASCADE = ("meta-llama/Llama-3.2-3B-Instruct", "meta-llama/Llama-3.1-8B-Instruct")
+
+# Shared so repeat calls reuse the HTTP session (TCP + TLS) to the Inference API
+_client: "InferenceClient | None" = None
+
+# In-process LRU of answers keyed by prompt hash, so an identical prompt never hits HF twice
+_PROMPT_CACHE_SIZE = 512
+_PROMPT_CACHE: OrderedDict[bytes, tuple[str, ...]] = OrderedDict()
+
+# Persists advice across runs; keyed by the rounded metrics the prompt is built from
+_disk_cache: "diskcache.Cache | None" = None
+
+
+def has_hf_token() -> bool:
+    return bool(os.environ.get("HF_TOKEN") or os.environ.get("HUGGING_FACE_HUB_TOKEN"))
+
+
+def _get_client() -> "InferenceClient":
+    """
+    Module-wide InferenceClient, created on first use (after .env has been loaded).
+    huggingface_hub is imported here rather than at module level to keep startup fast.
+    """
+    global _client
+    if _client is None:
+        from huggingface_hub import InferenceClient
+
+        _client = InferenceClient()
+    return _client
+
+
+def _get_disk_cache() -> "diskcache.Cache":
+    """On-disk advice cache in .advice_cache/, opened on first use so importing the package stays cheap."""
+    global _disk_cache
+    if _disk_cache is None:
+        import diskcache
+
+        _disk_cache = diskcache.Cache(".advice_cache")
+    return _disk_cache
+
+
+def reset_client() -> None:
+    """Drop the shared client, e.g. after HF_TOKEN changes; the next call builds a new one."""
+    global _client
+    _client = None
+
+
+def _round_metrics(metrics: dict) -> dict:
+    """
+    Round metrics for caching: temps to 0.5°C, rain to 0.1 mm, soil to 0.01,
+    so near-identical forecasts share one cached answer.
+    """
+    rain_1h = metrics.get("rain_next_hour_mm")
+    return {
+        "min_temp": round(metrics["min_temp"] * 2) / 2,
+        "max_temp": round(metrics["max_temp"] * 2) / 2,
+        "avg_temp": round(metrics["avg_temp"] * 2) / 2,
+        "total_rain": round(metrics["total_rain"], 1),
+        "min_soil": round(metrics["min_soil"], 2),
+        "rain_next_hour_mm": round(rain_1h, 1) if rain_1h is not None else None,
+    }
+
+
+def _cache_key(metrics: dict, location_name: str, model_cascade: Sequence[str]) -> tuple:
+    """
+    Hashable (location_name, rounded metrics items, fired triggers, model_cascade); fully
+    determines the request. Triggers are evaluated on the raw metrics, so a value that
+    rounds onto a threshold (e.g. max 30.2 -> 30.0) still fires.
+    """
+    return (
+        location_name,
+        tuple(_round_metrics(metrics).items()),
+        tuple(_fired_triggers(metrics)),
+        tuple(model_cascade),
+    )
+
+
+# name: (prompt rule, alert test, borderline test). Borderline = within reach of the alert threshold.
+_TRIGGERS = {
+    "heat": (
+        "heat(max>30)",
+        lambda m: m["max_temp"] > 30,
+        lambda m: m["max_temp"] > 27,
+    ),
+    "frost": (
+        "frost(min<0)",
+        lambda m: m["min_temp"] < 0,
+        lambda m: m["min_temp"] < 2,
+    ),
+    "irr": (
+        "irr(soil<0.2, critical<0.15)",
+        lambda m: m["min_soil"] < 0.2,
+        lambda m: m["min_soil"] < 0.25,
+    ),
+    "drain": (
+        "drain(rain24>5)",
+        lambda m: m["total_rain"] > 5,
+        lambda m: m["total_rain"] > 2,
+    ),
+    "nowcast": (
+        "nowcast(rain1h>0.5)",
+        lambda m: (m.get("rain_next_hour_mm") or 0) > 0.5,
+        lambda m: (m.get("rain_next_hour_mm") or 0) > 0.2,
+    ),
+}
+
+
+def _fired_triggers(metrics: dict) -> list[str]:
+    return [name for name, (_, alert, _) in _TRIGGERS.items() if alert(metrics)]
+
+
+def _quick_triage(metrics: dict) -> Literal["stable", "borderline", "alert"]:
+    """Rule-based pre-check: only "borderline" and "alert" need the model."""
+    if _fired_triggers(metrics):
+        return "alert"
+    if any(borderline(metrics) for _, _, borderline in _TRIGGERS.values()):
+        return "borderline"
+    return "stable"
+
+
+def _max_tokens(fired: Sequence[str]) -> int:
+    """Generation budget of ~40 tokens per expected bullet: one baseline plus one per fired trigger."""
+    n_bullets = 1 + len(fired)
+    return min(192, max(64, 40 * n_bullets))
+
+
+def _stable_advice(metrics: dict, location_name: str) -> list[str]:
+    """Canned advice for days where no trigger is close to firing."""
+    return [
+        f"Conditions: stable in {location_name} today, {metrics['min_temp']:.0f}–{metrics['max_temp']:.0f}°C "
+        f"with {metrics['total_rain']:.1f} mm rain.",
+        "Fieldwork: good day for routine tasks (weeding, spraying, harvesting).",
+        "Irrigation: soil moisture adequate; keep the usual schedule.",
+    ]
+
+
+# Schema-style prompt: labels and numeric thresholds only, no prose (about half the tokens)
+_ROLE = "Agronomist for smallholder farmers. Use only this data."
+
+_OUTPUT = "3-5 bullets 'Label: action' for TODAY, most urgent first, no preamble."
+
+
+def _triggers_line(names) -> str:
+    return "Triggers: " + ", ".join(_TRIGGERS[name][0] for name in names) + "."
+
+
+def _forecast_lines(metrics: dict) -> str:
+    rain_1h = metrics["rain_next_hour_mm"]
+    rain_1h_line = f"Rain1h:{rain_1h:.1f}mm\n" if rain_1h is not None else ""
+    return (
+        f"Tmin/max/avg:{metrics['min_temp']:.0f}/{metrics['max_temp']:.0f}/{metrics['avg_temp']:.0f}C\n"
+        f"Rain24:{metrics['total_rain']:.1f}mm\n"
+        f"{rain_1h_line}"
+        f"Soil:{metrics['min_soil']:.2f}"
+    )
+
+
+def _build_prompt(location_name: str, metrics: dict, fired: Sequence[str]) -> str:
+    """Alerts get a prompt scoped to the fired triggers; borderline cases get all of them."""
+    triggers = fired or _TRIGGERS
+    return f"{_ROLE} Output {_OUTPUT}\nLoc:{location_name}\n{_forecast_lines(metrics)}\n{_triggers_line(triggers)}"
+
+
+def _build_batch_prompt(keys: list[tuple]) -> str:
+    """One prompt covering several locations; the model answers in '### LOC <i>' blocks."""
+    locations = "\n".join(
+        f"{i}) Loc:{location_name}\n{_forecast_lines(dict(metrics))}"
+        for i, (location_name, metrics, _, _) in enumerate(keys, 1)
+    )
+    return (
+        f"{_ROLE} Per location output '### LOC <i>' then {_OUTPUT}\n"
+        f"{locations}\n{_triggers_line(_TRIGGERS)}"
+    )
+
+
+_BULLET_PREFIX_RE = re.compile(r"^[\s\-*•\d.)]+")
+_LOC_HEADER_RE = re.compile(r"^\W*#+\s*LOC\s*(\d+)\b.*$", re.MULTILINE)
+
+
+def _clean_bullet(line: str) -> str:
+    return _BULLET_PREFIX_RE.sub("", line).strip()
+
+
+def _parse_bullets(text: str) -> tuple[str, ...]:
+    return tuple(s for s in map(_clean_bullet, text.splitlines()) if s)
+
+
+# A short label (at most three words) then the action, so "Here are the bullet points for today:" fails
+_LABELLED_RE = re.compile(r"^[A-Z][A-Za-z/-]*(?: [A-Za-z/-]+){0,2}:\s*\S")
+
+
+def _acceptable(advice: Sequence[str]) -> bool:
+    """Cheap-model output check: at least 3 bullets, all in 'Label: action' form."""
+    return len(advice) >= 3 and all(_LABELLED_RE.match(line) for line in advice)
+
+
+def _complete(
+    client: "InferenceClient", model_id: str, prompt: str, max_tokens: int, stop: list[str] | None = None
+) -> str:
+    completion = client.chat.completions.create(
+        model=model_id,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        temperature=0.3,
+        stop=stop,
+    )
+    text = completion.choices[0].message.content
+    if not text:
+        raise ValueError("Model returned empty response")
+    return text
+
+
+def _disk_key(key: tuple) -> str:
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+def _prompt_hash(key: tuple) -> bytes:
+    """Digest of the single-location prompt for key plus the models it would be sent to."""
+    location_name, metrics, fired, model_cascade = key
+    prompt = _build_prompt(location_name, dict(metrics), fired)
+    return hashlib.blake2b("\0".join((prompt, *model_cascade)).encode(), digest_size=16).digest()
+
+
+def _remember_prompt(h: bytes, advice: tuple[str, ...]) -> None:
+    _PROMPT_CACHE[h] = advice
+    _PROMPT_CACHE.move_to_end(h)
+    if len(_PROMPT_CACHE) > _PROMPT_CACHE_SIZE:
+        _PROMPT_CACHE.popitem(last=False)
+
+
+def _lookup(key: tuple) -> tuple[str, ...] | None:
+    """Cached advice for key from the prompt cache, then disk (promoting disk hits to memory)."""
+    h = _prompt_hash(key)
+    advice = _PROMPT_CACHE.get(h)
+    if advice is not None:
+        _PROMPT_CACHE.move_to_end(h)
+        return advice
+    advice = _get_disk_cache().get(_disk_key(key))
+    if advice is not None:
+        _remember_prompt(h, advice)
+    return advice
+
+
+def _store(key: tuple, advice: tuple[str, ...]) -> None:
+    _remember_prompt(_prompt_hash(key), advice)
+    _get_disk_cache().set(_disk_key(key), advice)
+
+
+def _cached_advice(key: tuple) -> tuple[str, ...]:
+    """
+    Advice for a cache key, served from memory, then disk, then the API (walking the
+    model cascade). Only an answer that passes _acceptable, or that the last model gave,
+    is returned (and cached); otherwise raises, so errors and rejected drafts are never cached.
+    """
+    cached = _lookup(key)
+    if cached is not None:
+        return cached
+
+    location_name, metrics, fired, model_cascade = key
+    prompt = _build_prompt(location_name, dict(metrics), fired)
+    max_tokens = _max_tokens(fired)
+    client = _get_client()
+    error = None
+    for n, model_id in enumerate(model_cascade, 1):
+        try:
+            advice = _parse_bullets(_complete(client, model_id, prompt, max_tokens, stop=["\n\n"]))
+            error = None
+        except Exception as e:
+            error = e
+            continue
+        # A rejected draft is never kept: if the next model fails, that is the result
+        if advice and (_acceptable(advice) or n == len(model_cascade)):
+            _store(key, advice)
+            return advice
+    if error is not None:
+        raise error
+    raise ValueError("Model returned no parseable advice")
 
 
 def get_advice(
     metrics: dict,
     location_name: str,
     *,
-    model_id: str = "meta-llama/Llama-3.1-8B-Instruct",
+    model_cascade: Sequence[str] = _MODEL_CASCADE,
 ) -> tuple[list[str] | None, str | None]:
     """
-    Call Hugging Face Inference API for 3–5 bullet-point advice.
+    Call Hugging Face Inference API for 3–5 bullet-point advice. With a token, stable days
+    (no trigger near its threshold) get canned advice without an API call. Models in
+    model_cascade are tried cheapest first; the next is used only if an answer fails the
+    format check. Results are cached in memory (by prompt hash) and in .advice_cache/
+    (by location, rounded metrics and cascade).
     Returns (advice_list, None) on success; (None, None) if no token; (None, error_msg) on API failure.
     """
-    token = os.environ.get("HF_TOKEN") or os.environ.get("HUGGING_FACE_HUB_TOKEN")
-    if not token:
+    if not has_hf_token():
         return None, None
 
-    rain_1h = metrics.get("rain_next_hour_mm")
-    rain_1h_line = (
-        f"- Rain in next hour: {rain_1h:.1f} mm (immediate threat if >0.5 mm)\n        "
-        if rain_1h is not None
-        else ""
+    if _quick_triage(metrics) == "stable":
+        return _stable_advice(metrics, location_name), None
+
+    try:
+        return list(_cached_advice(_cache_key(metrics, location_name, model_cascade))), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _stream_bullets(client: "InferenceClient", model_id: str, prompt: str, max_tokens: int) -> Iterator[str]:
+    stream = client.chat.completions.create(
+        model=model_id,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        temperature=0.3,
+        stop=["\n\n"],
+        stream=True,
     )
-    prompt = f"""You are an expert agronomist advising smallholder farmers. Use ONLY the numbers below. Give 3–5 short, actionable bullet points for TODAY. Be specific and practical (what to do, when, and why). Prioritise by urgency. No preamble.
+    buffer = ""
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        buffer += chunk.choices[0].delta.content or ""
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            bullet = _clean_bullet(line)
+            if bullet:
+                yield bullet
+    bullet = _clean_bullet(buffer)
+    if bullet:
+        yield bullet
 
-Location: {location_name}
 
-Forecast (use these exact figures):
-- Temperature: min {metrics["min_temp"]:.1f}°C, max {metrics["max_temp"]:.1f}°C, average {metrics["avg_temp"]:.1f}°C
-- Total precipitation (next 24h): {metrics["total_rain"]:.1f} mm
-        {rain_1h_line}- Soil moisture (3–9 cm, 0–1 scale): {metrics["min_soil"]:.2f} (low if <0.2, critical if <0.15)
+def get_advice_stream(
+    metrics: dict,
+    location_name: str,
+    *,
+    model_cascade: Sequence[str] = _MODEL_CASCADE,
+) -> Iterator[str]:
+    """
+    Like get_advice, but streams the completion and yields each bullet as soon as its
+    line is complete. Bullets already shown cannot be retracted, so earlier models in the
+    cascade only yield 'Label: action' lines and escalation happens only if one yields none.
+    A short early-model answer is shown but not cached, so later calls still escalate.
+    Yields nothing if no token; raises on API failure or unusable output.
+    """
+    if not has_hf_token():
+        return
 
-Rules: Base advice only on the data above. Mention heat stress / shade if max temp is high; irrigation if soil is dry; drainage / delay fieldwork if rain is significant; immediate rain in next hour if >0.5 mm. One line per point, label briefly (e.g. "Heat:", "Irrigation:", "Rain:"). Reply with only the bullet points."""
+    if _quick_triage(metrics) == "stable":
+        yield from _stable_advice(metrics, location_name)
+        return
 
-    try:
-        client = InferenceClient()
-        completion = client.chat.completions.create(
-            model=model_id,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=256,
-            temperature=0.3,
-        )
-        text = completion.choices[0].message.content
-        if not text:
-            return None, "Model returned empty response"
-        lines = [
-            re.sub(r"^[\s\-*•\d.)]+", "", line).strip()
-            for line in text.strip().splitlines()
-            if line.strip()
-        ]
-        advice = [line for line in lines if line]
-        return (
-            (advice, None)
-            if advice
-            else (None, "Model returned no parseable advice")
-        )
-    except Exception as e:
-        return None, str(e)
+    key = _cache_key(metrics, location_name, model_cascade)
+    cached = _lookup(key)
+    if cached is not None:
+        yield from cached
+        return
+
+    _, rounded, fired, _ = key
+    prompt = _build_prompt(location_name, dict(rounded), fired)
+    max_tokens = _max_tokens(fired)
+    client = _get_client()
+    advice = []
+    for n, model_id in enumerate(model_cascade, 1):
+        last = n == len(model_cascade)
+        try:
+            for bullet in _stream_bullets(client, model_id, prompt, max_tokens):
+                if last or _LABELLED_RE.match(bullet):
+                    advice.append(bullet)
+                    yield bullet
+        except Exception:
+            if advice or last:
+                raise
+        if advice:
+            break
+    if not advice:
+        raise ValueError("Model returned no parseable advice")
+    # Cache only what get_advice / get_advice_batch would have accepted themselves
+    if last or _acceptable(advice):
+        _store(key, tuple(advice))
+
+
+def get_advice_batch(
+    items: list[tuple[dict, str]],
+    *,
+    model_cascade: Sequence[str] = _MODEL_CASCADE,
+) -> list[tuple[list[str] | None, str | None]]:
+    """
+    Advice for several (metrics, location_name) pairs with a single Inference API call
+    for all cache misses, so the instructions are paid for once rather than per location.
+    Locations whose block fails the format check are re-batched with the next model.
+    Returns one get_advice-style (advice_list, error_msg) tuple per item, in order.
+    """
+    if not has_hf_token():
+        return [(None, None)] * len(items)
+
+    keys = [_cache_key(metrics, location_name, model_cascade) for metrics, location_name in items]
+    results: list[tuple[list[str] | None, str | None]] = [(None, None)] * len(keys)
+    pending = []
+    for i, (metrics, location_name) in enumerate(items):
+        if _quick_triage(metrics) == "stable":
+            results[i] = (_stable_advice(metrics, location_name), None)
+        else:
+            pending.append(i)
+
+    misses = []
+    for i in pending:
+        key = keys[i]
+        cached = _lookup(key)
+        if cached is not None:
+            results[i] = (list(cached), None)
+        else:
+            misses.append(i)
+    if not misses:
+        return results
+
+    client = _get_client()
+    remaining = list(dict.fromkeys(keys[i] for i in misses))
+    advice_by_key: dict[tuple, tuple[str, ...]] = {}
+    error = "Model returned no parseable advice"
+    for n, model_id in enumerate(model_cascade, 1):
+        last = n == len(model_cascade)
+        # Per-location budgets plus room for each '### LOC <i>' header; no stop sequence,
+        # since blank lines separate the blocks
+        max_tokens = sum(_max_tokens(fired) + 8 for _, _, fired, _ in remaining)
+        try:
+            text = _complete(client, model_id, _build_batch_prompt(remaining), max_tokens)
+        except Exception as e:
+            error = str(e)
+            continue
+        error = "Model returned no parseable advice"
+        # re.split with a capture group yields [preamble, n1, block1, n2, block2, ...]
+        parts = _LOC_HEADER_RE.split(text)
+        blocks = {int(n): _parse_bullets(block) for n, block in zip(parts[1::2], parts[2::2])}
+        retry = []
+        for i, key in enumerate(remaining, 1):
+            advice = blocks.get(i)
+            # Same rule as _cached_advice: rejected blocks are retried, never kept
+            if advice and (last or _acceptable(advice)):
+                advice_by_key[key] = advice
+            else:
+                retry.append(key)
+        remaining = retry
+        if not remaining:
+            break
+
+    for key, advice in advice_by_key.items():
+        _store(key, advice)
+    for i in misses:
+        advice = advice_by_key.get(keys[i])
+        results[i] = (list(advice), None) if advice else (None, error)
+    return results
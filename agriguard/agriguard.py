@@ -1,12 +1,18 @@
 """AgriGuard: weather-based agronomic alerts. Composes geocode, weather, and advice modules."""
 
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from agriguard.advice import get_advice
+from agriguard.advice import get_advice, get_advice_batch, get_advice_stream, has_hf_token
 from agriguard.geocode import geocode
 from agriguard.weather import fetch_forecast_metrics
 
 
+_TOKEN_HINT = "⚠️ Set HF_TOKEN (or HUGGING_FACE_HUB_TOKEN) in .env or environment and retry."
+_FORECAST_UNAVAILABLE = "⚠️ Forecast unavailable."
+
+
 class AgriGuard:
     """Weather-based agronomic alerts. Use either lat/lon or city name."""
 
@@ -19,6 +25,9 @@ class AgriGuard:
 
         Either (latitude and longitude) or city_name must be provided.
         """
+        # Checked once: without a token there is no advice, so the forecast is not fetched
+        self._has_hf = has_hf_token()
+        self.refresh_timestamp()
         if latitude is not None and longitude is not None:
             self.lat = float(latitude)
             self.lon = float(longitude)
@@ -29,30 +38,140 @@ class AgriGuard:
         else:
             raise ValueError("Provide either (latitude, longitude) or city_name.")
 
-    def get_ai_agri_advice(self):
-        """24-hour forecast and agronomic advice from Hugging Face open model. Requires HF_TOKEN."""
+    @classmethod
+    def batch(cls, cities: list[str], *, max_workers: int = 8) -> list[tuple["AgriGuard", list[str]]]:
+        """
+        Advice for many cities: geocode and fetch forecasts concurrently, then one LLM call
+        for all of them. Returns (AgriGuard, advice) per city, in input order.
+        """
+        return [(app, advice) for app, advice, _ in cls._batch(cities, max_workers=max_workers)]
+
+    @classmethod
+    def _batch(cls, cities: list[str], *, max_workers: int) -> list[tuple["AgriGuard", list[str], bool]]:
+        """batch() plus, per city, whether the lines are real advice rather than an error message."""
+
+        def prepare(city):
+            # Geocode and forecast in the same task, so each city's forecast starts as soon
+            # as its own coordinates are known
+            app = cls(city_name=city)
+            metrics = fetch_forecast_metrics(app.lat, app.lon) if app.lat is not None and app._has_hf else None
+            return app, metrics
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            prepared = list(pool.map(prepare, cities))
+        results = iter(get_advice_batch([(m, app._display_name) for app, m in prepared if m is not None]))
+
+        def finish(app, metrics):
+            if metrics is not None:
+                return app._advice(metrics=metrics, result=next(results))
+            if app.lat is not None and app._has_hf:
+                # The concurrent fetch already failed (after its retries); don't refetch serially
+                return [_FORECAST_UNAVAILABLE], False
+            return app._advice()  # location error or token hint, no network
+
+        return [(app, *finish(app, m)) for app, m in prepared]
+
+    @classmethod
+    def run_many(
+        cls,
+        cities: list[str],
+        *,
+        sms=None,
+        recipients: dict[str, list[str]] | None = None,
+        max_workers: int = 8,
+    ) -> tuple[list[tuple["AgriGuard", list[str], list]], dict[str, str]]:
+        """
+        batch() followed by the SMS fan-out: each city's advice goes to its numbers in
+        recipients via sms.send_bulk (e.g. outbound.SMSClient), which sends concurrently.
+        Cities whose advice could not be generated are not texted.
+
+        Returns (runs, skipped): runs holds (AgriGuard, advice, send results) per city, in
+        input order (send results are [] for skipped cities); skipped maps each city that
+        had recipients but no advice to the reason.
+        """
+        runs, skipped = [], {}
+        for city, (app, advice, ok) in zip(cities, cls._batch(cities, max_workers=max_workers)):
+            numbers = (recipients or {}).get(city, [])
+            sent = []
+            if sms is not None and numbers:
+                if ok:
+                    sent = sms.send_bulk(numbers, "\n".join(advice))
+                else:
+                    skipped[city] = advice[0]
+            runs.append((app, advice, sent))
+        return runs, skipped
+
+    def get_ai_agri_advice(self, *, metrics: dict | None = None, result: tuple | None = None):
+        """
+        24-hour forecast and agronomic advice from Hugging Face open model. Requires HF_TOKEN.
+
+        Args:
+            metrics: Optional. Pre-fetched forecast metrics (skips the forecast request).
+            result: Optional. Pre-computed (advice, error) from get_advice_batch (skips the LLM call).
+        """
+        return self._advice(metrics=metrics, result=result)[0]
+
+    def _advice(self, *, metrics: dict | None = None, result: tuple | None = None) -> tuple[list[str], bool]:
+        """get_ai_agri_advice() lines, and True only if they are advice rather than an error message."""
         if self.lat is None:
-            return ["Location Error"]
+            return ["Location Error"], False
+        if not self._has_hf:
+            return [_TOKEN_HINT], False
 
-        metrics = fetch_forecast_metrics(self.lat, self.lon)
         if metrics is None:
-            return ["⚠️ Forecast unavailable."]
+            metrics = fetch_forecast_metrics(self.lat, self.lon)
+        if metrics is None:
+            return [_FORECAST_UNAVAILABLE], False
 
-        advice, api_error = get_advice(metrics, self._display_name)
+        advice, api_error = result if result is not None else get_advice(metrics, self._display_name)
         if advice is not None:
-            return advice
+            return list(advice), True
         if api_error:
-            return [f"⚠️ AI advice unavailable: {api_error}"]
-        return [
-            "⚠️ Set HF_TOKEN (or HUGGING_FACE_HUB_TOKEN) in .env or environment and retry."
-        ]
+            return [f"⚠️ AI advice unavailable: {api_error}"], False
+        return [_TOKEN_HINT], False
+
+    def stream_ai_agri_advice(self) -> Iterator[str]:
+        """Like get_ai_agri_advice, but yields each bullet as soon as the model produces it."""
+        if self.lat is None:
+            yield "Location Error"
+            return
+        if not self._has_hf:
+            yield _TOKEN_HINT
+            return
 
-    def print_display(self, advice: list[str]) -> None:
-        """Print advice summary (e.g. console / SMS-style)."""
+        metrics = fetch_forecast_metrics(self.lat, self.lon)
+        if metrics is None:
+            yield _FORECAST_UNAVAILABLE
+            return
+
+        produced = False
+        try:
+            for line in get_advice_stream(metrics, self._display_name):
+                produced = True
+                yield line
+        except Exception as e:
+            yield f"⚠️ AI advice unavailable: {e}"
+            return
+        if not produced:
+            yield _TOKEN_HINT
+
+    def refresh_timestamp(self) -> None:
+        """Reset the "Generated" time shown by print_display (e.g. in long-running processes)."""
+        self._generated_at = datetime.now().strftime("%Y-%m-%d %H:%M")
+
+    def print_display(self, advice: Iterable[str]) -> list[str]:
+        """
+        Print advice summary (e.g. console / SMS-style). Lines are printed as they arrive,
+        so a stream_ai_agri_advice() generator shows each bullet immediately.
+        Returns the printed advice lines.
+        """
         print("\n" + "=" * 45)
         print(f"🌾 AGRIGUARD: {self._display_name.upper()} — TODAY'S ADVICE")
-        print(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        print("-" * 45)
+        print(f"Generated: {self._generated_at}")
+        print("-" * 45, flush=True)
+        lines = []
         for line in advice:
-            print(f"• {line}")
+            print(f"• {line}", flush=True)
+            lines.append(line)
         print("=" * 45 + "\n")
+        return lines
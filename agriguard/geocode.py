@@ -1,16 +1,75 @@
 """Resolve city/region name to latitude and longitude via Open-Meteo Geocoding API."""
 
+import json
+import os
+import threading
+
 from agriguard.http_client import retry_session
 
+# City -> coordinates never changes, so results persist on disk keyed by lowercased name
+_GEOCODE_PATH = ".geocode.json"
+_GEOCODE_SEED = {
+    "london": {"name": "London", "country": "United Kingdom", "latitude": 51.50853, "longitude": -0.12574},
+    "porto": {"name": "Porto", "country": "Portugal", "latitude": 41.14961, "longitude": -8.61099},
+    "lodwar": {"name": "Lodwar", "country": "Kenya", "latitude": 3.11911, "longitude": 35.59727},
+    "berlin": {"name": "Berlin", "country": "Germany", "latitude": 52.52437, "longitude": 13.41053},
+}
+
+
+def _valid_entry(loc) -> bool:
+    return (
+        isinstance(loc, dict)
+        and isinstance(loc.get("name"), str)
+        and isinstance(loc.get("country"), str)
+        and all(isinstance(loc.get(k), (int, float)) for k in ("latitude", "longitude"))
+    )
+
+
+def _load_cache() -> dict:
+    """Seed plus the saved results; malformed entries are dropped so those cities are looked up again."""
+    try:
+        with open(_GEOCODE_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return dict(_GEOCODE_SEED)
+    if not isinstance(data, dict):
+        return dict(_GEOCODE_SEED)
+    return {**_GEOCODE_SEED, **{key: loc for key, loc in data.items() if _valid_entry(loc)}}
+
+
+_GEOCODE_CACHE = _load_cache()
+_cache_lock = threading.Lock()
+
+
+def _store(key: str, loc: dict) -> None:
+    """Add a result and rewrite the cache file atomically (temp file + os.replace)."""
+    with _cache_lock:
+        _GEOCODE_CACHE[key] = loc
+        tmp_path = _GEOCODE_PATH + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(_GEOCODE_CACHE, f)
+            os.replace(tmp_path, _GEOCODE_PATH)
+        except OSError:
+            pass
+
 
 def geocode(city_name: str, *, verbose: bool = True) -> tuple[float | None, float | None]:
     """
     Resolve city name to (lat, lon). Returns (None, None) on failure.
+    Results are cached in .geocode.json, so repeat cities skip the HTTP request.
 
     Args:
         city_name: City or region name (e.g. "Lodwar", "Porto").
         verbose: If True, print resolved location or error to stdout.
     """
+    key = city_name.strip().lower()
+    loc = _GEOCODE_CACHE.get(key)
+    if loc is not None:
+        if verbose:
+            print(f"📍 Location: {loc['name']}, {loc['country']}")
+        return loc["latitude"], loc["longitude"]
+
     url = "https://geocoding-api.open-meteo.com/v1/search"
     params = {"name": city_name, "count": 1, "language": "en", "format": "json"}
     try:
@@ -19,6 +78,15 @@ def geocode(city_name: str, *, verbose: bool = True) -> tuple[float | None, floa
             raise Exception(res.get("reason", "Geocoding API error"))
         if "results" in res and res["results"]:
             loc = res["results"][0]
+            _store(
+                key,
+                {
+                    "name": loc["name"],
+                    "country": loc.get("country", ""),
+                    "latitude": loc["latitude"],
+                    "longitude": loc["longitude"],
+                },
+            )
             if verbose:
                 print(f"📍 Location: {loc['name']}, {loc['country']}")
             return loc["latitude"], loc["longitude"]
@@ -4,7 +4,10 @@ import openmeteo_requests
 import requests_cache
 from retry_requests import retry
 
-# 1-hour cache, 5 retries with backoff
-_cache_session = requests_cache.CachedSession(".cache", expire_after=3600)
+# 1-hour cache, 5 retries with backoff. WAL lets concurrent readers share the SQLite
+# cache; fast_save skips fsync (losing a cache entry on crash is harmless).
+_cache_session = requests_cache.CachedSession(".cache", expire_after=3600, wal=True, fast_save=True)
+# Open the DB and create its schema now rather than on the first geocode request
+_cache_session.cache.contains(key="warmup")
 retry_session = retry(_cache_session, retries=5, backoff_factor=0.2)
 openmeteo = openmeteo_requests.Client(session=retry_session)
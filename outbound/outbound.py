@@ -1,30 +1,172 @@
-from twilio.rest import Client
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import math
+import threading
 import time
+import warnings
+
+import phonenumbers
+
+# Twilio Notify accepts up to 10k bindings per notification
+NOTIFY_MAX_BINDINGS = 10_000
+
+# Twilio rejects bodies longer than this
+MAX_BODY_CHARS = 1600
+
+# GSM-7 alphabet; extension characters take two septets. Anything else forces UCS-2.
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+
+def segment_count(body: str) -> int:
+    """Number of SMS segments body is billed as (GSM-7: 160/153 per part, UCS-2: 70/67)"""
+    if all(c in GSM7_BASIC or c in GSM7_EXTENDED for c in body):
+        length = len(body) + sum(c in GSM7_EXTENDED for c in body)
+        single, multi = 160, 153
+    else:
+        length = len(body.encode("utf-16-le")) // 2
+        single, multi = 70, 67
+    return 1 if length <= single else math.ceil(length / multi)
+
+
+def _to_e164(number: str) -> str | None:
+    """Canonical E.164 form of number, or None if it is not a valid phone number"""
+    try:
+        parsed = phonenumbers.parse(number, None)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def _check_body(body: str) -> str | None:
+    """Error message if Twilio would reject body; warns when it splits into several segments"""
+    if len(body) > MAX_BODY_CHARS:
+        return f"Body exceeds {MAX_BODY_CHARS} characters"
+    segments = segment_count(body)
+    if segments > 1:
+        warnings.warn(
+            f"SMS body is {segments} segments; each recipient is billed per segment",
+            stacklevel=3,
+        )
+    return None
+
+
+class _TokenBucket():
+    """Blocking rate limiter: at most `rate` acquisitions per second, spaced 1/rate apart (no bursts)"""
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = 1.0
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 
 class SMSClient():
     """Handles outbound messages"""
-    def __init__(self, account_sid: str, auth_token: str, from_number: str, time_delay: float=0.5):
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        from_number: str,
+        *,
+        notify_service_sid: str | None = None,
+        rate_per_sec: float = 10,
+    ):
+        # Imported here: twilio is slow to import and only needed once a client exists
+        from twilio.rest import Client
+
         self.client = Client(account_sid, auth_token)
         self.from_number = from_number
-        self.time_delay = time_delay
+        self.notify_service_sid = notify_service_sid
+        # One bucket per client, so the limit holds across back-to-back send_bulk calls
+        self._bucket = _TokenBucket(rate_per_sec)
 
     def send_sms(self, to: str, body: str):
-        """Send one SMS using Twilio API"""
+        """Send one SMS using Twilio API. Raises ValueError, without calling Twilio, if to or body is invalid"""
+        e164 = _to_e164(to)
+        error = _check_body(body) or (None if e164 else "Invalid E.164 phone number")
+        if error:
+            raise ValueError(error)
+        return self._create(e164, body)
+
+    def _create(self, to: str, body: str):
         return self.client.messages.create(
             from_=self.from_number,
-            to=to, 
+            to=to,
             body=body
         )
 
-    def send_bulk(self, numbers: str, body: str):
-        """Iterate over batch of numbers"""
-        results = []
+    def send_bulk(self, numbers: list[str], body: str, max_workers: int = 20):
+        """
+        Send the same body to a batch of numbers. Returns [(number, ok, sid_or_error), ...]
+        in input order. The body (and its segment count) is checked once and numbers are
+        validated locally; only valid numbers reach Twilio, and each distinct number (in
+        E.164 form) is sent to once, with duplicates sharing its result. Uses one Notify
+        request per 10k numbers if a notify_service_sid was given, otherwise fans out over
+        a thread pool capped at the client's rate_per_sec.
+        """
+        error = _check_body(body)
+        if error:
+            return [(n, False, error) for n in numbers]
+
+        e164 = {n: _to_e164(n) for n in numbers}
+        unique = list(dict.fromkeys(e for e in e164.values() if e))
 
-        for n in numbers:
+        if self.notify_service_sid:
+            sent = self._send_bulk_notify(unique, body)
+        else:
+            sent = self._send_bulk_pool(unique, body, max_workers)
+        by_e164 = {r[0]: r[1:] for r in sent}
+        return [
+            (n, *by_e164[e164[n]]) if e164[n] else (n, False, "Invalid E.164 phone number")
+            for n in numbers
+        ]
+
+    def _send_bulk_pool(self, numbers: list[str], body: str, max_workers: int):
+        """Concurrent per-number sends, gated by the client's token bucket to respect Twilio's rate limit"""
+        results = [None] * len(numbers)
+
+        def _send(n):
+            self._bucket.acquire()
+            return self._create(n, body)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_send, n): i for i, n in enumerate(numbers)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    results[i] = (numbers[i], True, fut.result().sid)
+                except Exception as e:
+                    results[i] = (numbers[i], False, str(e))
+        return results
+
+    def _send_bulk_notify(self, numbers: list[str], body: str):
+        """Send via Twilio Notify: a single POST per chunk of up to 10k bindings"""
+        service = self.client.notify.v1.services(self.notify_service_sid)
+        results = []
+        for start in range(0, len(numbers), NOTIFY_MAX_BINDINGS):
+            chunk = numbers[start:start + NOTIFY_MAX_BINDINGS]
+            bindings = [json.dumps({"binding_type": "sms", "address": n}) for n in chunk]
             try:
-                msg = self.send_sms(n, body)
-                results.append((n, True, msg.sid))
+                notification = service.notifications.create(to_binding=bindings, body=body)
+                results.extend((n, True, notification.sid) for n in chunk)
             except Exception as e:
-                results.append((n, False, str(e)))
-            time.sleep(self.time_delay)
-
+                results.extend((n, False, str(e)) for n in chunk)
+        return results
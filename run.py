@@ -31,8 +31,7 @@ if __name__ == "__main__":
     # app = AgriGuard(latitude=52.52, longitude=13.41)
 
     if app.lat is not None:
-        advice = app.get_ai_agri_advice()
-        app.print_display(advice)
+        advice = app.print_display(app.stream_ai_agri_advice())
         tl = translator.translate(advice)
         print(tl)
         smsclient.send_sms(TWILIO_TO_NUMBER, tl)
@@ -0,0 +1,55 @@
+"""Shared fakes: a scripted Hugging Face client and an in-memory advice cache."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from agriguard import advice
+
+
+class FakeDiskCache(dict):
+    """dict with diskcache.Cache's set()"""
+
+    def set(self, key, value):
+        self[key] = value
+
+
+class FakeInferenceClient:
+    """
+    Stands in for huggingface_hub.InferenceClient. replies maps model id -> list of
+    responses, consumed in order; a response is the completion text or an Exception to raise.
+    Every request is recorded in calls.
+    """
+
+    def __init__(self, replies: dict[str, list]):
+        self.replies = {model: list(texts) for model, texts in replies.items()}
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, *, model, messages, max_tokens, temperature, stop=None, stream=False):
+        self.calls.append({"model": model, "prompt": messages[0]["content"], "max_tokens": max_tokens})
+        reply = self.replies[model].pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        if stream:
+            # Split mid-line so the bullet reassembly in _stream_bullets is exercised
+            return iter(
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=reply[i:i + 7]))])
+                for i in range(0, len(reply), 7)
+            )
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+@pytest.fixture
+def fake_hf(monkeypatch):
+    """Returns a factory: fake_hf({model: [replies]}) installs and returns a FakeInferenceClient."""
+    monkeypatch.setenv("HF_TOKEN", "test-token")
+    monkeypatch.setattr(advice, "_disk_cache", FakeDiskCache())
+    monkeypatch.setattr(advice, "_PROMPT_CACHE", type(advice._PROMPT_CACHE)())
+
+    def install(replies):
+        client = FakeInferenceClient(replies)
+        monkeypatch.setattr(advice, "_client", client)
+        return client
+
+    return install
@@ -0,0 +1,224 @@
+import pytest
+
+from agriguard import advice
+from agriguard.advice import (
+    _LABELLED_RE,
+    _LOC_HEADER_RE,
+    _MODEL_CASCADE,
+    _parse_bullets,
+    _quick_triage,
+    get_advice,
+    get_advice_batch,
+    get_advice_stream,
+)
+
+SMALL, LARGE = _MODEL_CASCADE
+
+# Nothing near a threshold
+STABLE = {
+    "min_temp": 10.0,
+    "max_temp": 20.0,
+    "avg_temp": 15.0,
+    "total_rain": 0.0,
+    "min_soil": 0.35,
+    "rain_next_hour_mm": 0.0,
+}
+
+GOOD = "- Irrigation: water at dusk\n- Fieldwork: weed early\n- Pests: scout for aphids"
+
+
+def day(**overrides):
+    return {**STABLE, **overrides}
+
+
+def test_loc_header_split_tolerates_markdown_and_order():
+    text = "Sure!\n**### LOC 2**\n- Frost: cover seedlings\n\n## LOC 1 (Porto)\n- Irrigation: water\n"
+    parts = _LOC_HEADER_RE.split(text)
+    blocks = {int(n): _parse_bullets(block) for n, block in zip(parts[1::2], parts[2::2])}
+    assert blocks == {1: ("Irrigation: water",), 2: ("Frost: cover seedlings",)}
+
+
+def test_batch_one_call_then_rebatches_only_failures(fake_hf):
+    client = fake_hf(
+        {
+            SMALL: [f"### LOC 1\n{GOOD}\n\n### LOC 2\n- spray now\n"],
+            LARGE: [f"### LOC 1\n{GOOD.replace('dusk', 'dawn')}\n"],
+        }
+    )
+    items = [(day(max_temp=31), "Porto"), (STABLE, "Berlin"), (day(min_temp=-1), "Lodwar")]
+    porto, berlin, lodwar = get_advice_batch(items)
+
+    assert porto == (["Irrigation: water at dusk", "Fieldwork: weed early", "Pests: scout for aphids"], None)
+    assert berlin[0][0].startswith("Conditions: stable in Berlin")
+    assert lodwar[0][0] == "Irrigation: water at dawn"
+
+    assert [c["model"] for c in client.calls] == [SMALL, LARGE]
+    first, retry = (c["prompt"] for c in client.calls)
+    assert "Loc:Porto" in first and "Loc:Lodwar" in first and "Berlin" not in first
+    assert "Loc:Lodwar" in retry and "Porto" not in retry
+
+
+def test_batch_unanswered_location_gets_error(fake_hf):
+    fake_hf({SMALL: [f"### LOC 1\n{GOOD}\n"], LARGE: ["Sorry, I cannot help with that."]})
+    porto, lodwar = get_advice_batch([(day(max_temp=31), "Porto"), (day(min_temp=-1), "Lodwar")])
+    assert porto[1] is None
+    assert lodwar == (None, "Model returned no parseable advice")
+
+
+def test_batch_serves_cache_hits_without_a_call(fake_hf):
+    client = fake_hf({SMALL: [GOOD]})
+    get_advice(day(max_temp=31), "Porto")
+    assert get_advice_batch([(day(max_temp=31), "Porto")])[0][0][0] == "Irrigation: water at dusk"
+    assert len(client.calls) == 1
+
+
+def test_stream_yields_bullets_and_caches_acceptable_answer(fake_hf):
+    client = fake_hf({SMALL: [GOOD]})
+    assert list(get_advice_stream(day(max_temp=31), "Porto")) == [
+        "Irrigation: water at dusk",
+        "Fieldwork: weed early",
+        "Pests: scout for aphids",
+    ]
+    assert get_advice(day(max_temp=31), "Porto")[0][0] == "Irrigation: water at dusk"
+    assert len(client.calls) == 1
+
+
+@pytest.mark.parametrize(
+    "overrides, expected",
+    [
+        ({}, "stable"),
+        ({"rain_next_hour_mm": None}, "stable"),
+        ({"max_temp": 27.0}, "stable"),
+        ({"max_temp": 28.0}, "borderline"),
+        ({"max_temp": 30.0}, "borderline"),
+        # Rounds to 30.0 for the cache key, but triage sees the raw value
+        ({"max_temp": 30.2}, "alert"),
+        ({"min_temp": 2.0}, "stable"),
+        ({"min_temp": 1.5}, "borderline"),
+        ({"min_temp": -0.2}, "alert"),
+        ({"min_soil": 0.22}, "borderline"),
+        ({"min_soil": 0.19}, "alert"),
+        ({"total_rain": 3.0}, "borderline"),
+        ({"total_rain": 5.5}, "alert"),
+        ({"rain_next_hour_mm": 0.3}, "borderline"),
+        ({"rain_next_hour_mm": 0.6}, "alert"),
+    ],
+)
+def test_quick_triage_thresholds(overrides, expected):
+    assert _quick_triage(day(**overrides)) == expected
+
+
+def test_stable_day_skips_the_model(fake_hf):
+    client = fake_hf({})
+    result, error = get_advice(STABLE, "Porto")
+    assert error is None and result[0].startswith("Conditions: stable in Porto")
+    assert list(get_advice_stream(STABLE, "Porto")) == result
+    assert client.calls == []
+
+
+def test_cascade_stops_at_acceptable_small_model(fake_hf):
+    client = fake_hf({SMALL: [GOOD]})
+    assert get_advice(day(max_temp=31), "Porto") == (
+        ["Irrigation: water at dusk", "Fieldwork: weed early", "Pests: scout for aphids"],
+        None,
+    )
+    assert [c["model"] for c in client.calls] == [SMALL]
+
+
+def test_cascade_escalates_and_caches(fake_hf):
+    client = fake_hf({SMALL: ["water the crops"], LARGE: [GOOD]})
+    metrics = day(max_temp=31)
+    first = get_advice(metrics, "Porto")
+    assert first[0][0] == "Irrigation: water at dusk"
+    assert [c["model"] for c in client.calls] == [SMALL, LARGE]
+
+    # Near-identical metrics round to the same key: served from cache
+    assert get_advice(day(max_temp=31.1), "Porto") == first
+    assert len(client.calls) == 2
+
+
+def test_cascade_falls_through_api_errors(fake_hf):
+    fake_hf({SMALL: [RuntimeError("503")], LARGE: [GOOD]})
+    assert get_advice(day(max_temp=31), "Porto")[0][0] == "Irrigation: water at dusk"
+
+
+def test_cascade_error_is_reported_not_cached(fake_hf):
+    client = fake_hf({SMALL: [RuntimeError("503")], LARGE: [RuntimeError("504")]})
+    assert get_advice(day(max_temp=31), "Porto") == (None, "504")
+    assert advice._disk_cache == {}
+    assert len(client.calls) == 2
+
+
+def test_stream_does_not_cache_short_small_model_answer(fake_hf):
+    short = "- Irrigation: water at dusk\nthat is all"
+    client = fake_hf({SMALL: [short, short], LARGE: [GOOD]})
+    assert list(get_advice_stream(day(max_temp=31), "Porto")) == ["Irrigation: water at dusk"]
+    # Not cached, so the next non-streamed call escalates through the cascade
+    assert get_advice(day(max_temp=31), "Porto")[0][1] == "Fieldwork: weed early"
+    assert [c["model"] for c in client.calls] == [SMALL, SMALL, LARGE]
+
+
+def test_parse_bullets_strips_markers_and_blank_lines():
+    text = "1. Irrigation: water\n\n  * Pests: scout\n• Harvest: today\n"
+    assert _parse_bullets(text) == ("Irrigation: water", "Pests: scout", "Harvest: today")
+
+
+def test_no_token_skips_all_work(fake_hf, monkeypatch):
+    client = fake_hf({})
+    monkeypatch.delenv("HF_TOKEN")
+    monkeypatch.delenv("HUGGING_FACE_HUB_TOKEN", raising=False)
+    assert get_advice(day(max_temp=31), "Porto") == (None, None)
+    assert get_advice_batch([(day(max_temp=31), "Porto")]) == [(None, None)]
+    assert list(get_advice_stream(day(max_temp=31), "Porto")) == []
+    assert client.calls == []
+
+
+def test_cascade_does_not_keep_rejected_draft_when_next_model_fails(fake_hf):
+    client = fake_hf({SMALL: ["Sure, here you go", GOOD], LARGE: [RuntimeError("503")]})
+    assert get_advice(day(max_temp=31), "Porto") == (None, "503")
+    assert advice._disk_cache == {}
+
+    # Nothing was cached, so the next call goes back to the models
+    assert get_advice(day(max_temp=31), "Porto")[0][0] == "Irrigation: water at dusk"
+    assert len(client.calls) == 3
+
+
+def test_batch_does_not_keep_rejected_block_when_next_model_fails(fake_hf):
+    fake_hf({SMALL: [f"### LOC 1\n{GOOD}\n\n### LOC 2\n- spray now\n"], LARGE: [RuntimeError("503")]})
+    porto, lodwar = get_advice_batch([(day(max_temp=31), "Porto"), (day(min_temp=-1), "Lodwar")])
+    assert porto[1] is None
+    assert lodwar == (None, "503")
+    assert len(advice._disk_cache) == 1
+
+
+@pytest.mark.parametrize(
+    "line, labelled",
+    [
+        ("Irrigation: water at dusk", True),
+        ("Crop protection: cover seedlings", True),
+        ("Pest/disease watch: scout for aphids", True),
+        ("Here are the bullet points for today:", False),
+        ("Here are the bullet points for today: water", False),
+        ("Irrigation:", False),
+        ("irrigation: water", False),
+    ],
+)
+def test_labelled_line(line, labelled):
+    assert bool(_LABELLED_RE.match(line)) is labelled
+
+
+def test_preamble_does_not_pass_the_format_check(fake_hf):
+    client = fake_hf({SMALL: [f"Here are the bullet points for today:\n{GOOD}"], LARGE: [GOOD]})
+    assert get_advice(day(max_temp=31), "Porto")[0][0] == "Irrigation: water at dusk"
+    assert [c["model"] for c in client.calls] == [SMALL, LARGE]
+
+
+def test_stream_escalates_past_preamble_only_reply(fake_hf):
+    # stop=["\n\n"] cuts generation right after a preamble line
+    client = fake_hf({SMALL: ["Here are the bullet points for today:"], LARGE: [GOOD]})
+    assert list(get_advice_stream(day(max_temp=31), "Porto")) == [
+        "Irrigation: water at dusk",
+        "Fieldwork: weed early",
+        "Pests: scout for aphids",
+    ]
+    assert [c["model"] for c in client.calls] == [SMALL, LARGE]
@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agriguard import agriguard
+from agriguard.agriguard import AgriGuard
+
+COORDS = {"Porto": (41.1, -8.6), "Lodwar": (3.1, 35.6), "Berlin": (52.5, 13.4)}
+
+ADVICE = ["Irrigation: water at dusk", "Fieldwork: weed early", "Pests: scout for aphids"]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """
+    Fakes geocode, forecast and batch advice. Cities in COORDS geocode; forecasts for cities
+    in failing_forecasts return None; get_advice_batch answers from replies (by location).
+    """
+    state = SimpleNamespace(failing_forecasts=set(), replies={}, fetched=[], batches=[])
+    by_lat = {lat: city for city, (lat, _) in COORDS.items()}
+
+    def fetch(lat, lon):
+        city = by_lat[lat]
+        state.fetched.append(city)
+        return None if city in state.failing_forecasts else {"city": city}
+
+    def batch(items):
+        state.batches.append([name for _, name in items])
+        return [state.replies.get(name, (ADVICE, None)) for _, name in items]
+
+    monkeypatch.setenv("HF_TOKEN", "test-token")
+    monkeypatch.setattr(agriguard, "geocode", lambda city: COORDS.get(city, (None, None)))
+    monkeypatch.setattr(agriguard, "fetch_forecast_metrics", fetch)
+    monkeypatch.setattr(agriguard, "get_advice_batch", batch)
+    return state
+
+
+def test_batch_one_advice_call_in_input_order(pipeline):
+    pipeline.replies["Porto"] = (None, "503")
+    results = AgriGuard.batch(["Lodwar", "Nowhere", "Porto"])
+
+    assert [app._display_name for app, _ in results] == ["Lodwar", "Nowhere", "Porto"]
+    assert [advice for _, advice in results] == [
+        ADVICE,
+        ["Location Error"],
+        ["⚠️ AI advice unavailable: 503"],
+    ]
+    assert pipeline.batches == [["Lodwar", "Porto"]]
+
+
+def test_batch_does_not_refetch_failed_forecast(pipeline):
+    pipeline.failing_forecasts.add("Porto")
+    results = AgriGuard.batch(["Porto", "Berlin"])
+
+    assert [advice for _, advice in results] == [["⚠️ Forecast unavailable."], ADVICE]
+    assert sorted(pipeline.fetched) == ["Berlin", "Porto"]
+    assert pipeline.batches == [["Berlin"]]
+
+
+def test_batch_without_token_skips_forecasts(pipeline, monkeypatch):
+    monkeypatch.delenv("HF_TOKEN")
+    monkeypatch.delenv("HUGGING_FACE_HUB_TOKEN", raising=False)
+    ((_, advice),) = AgriGuard.batch(["Porto"])
+
+    assert advice[0].startswith("⚠️ Set HF_TOKEN")
+    assert pipeline.fetched == []
+
+
+def test_batch_flags_only_real_advice(pipeline):
+    pipeline.failing_forecasts.add("Berlin")
+    pipeline.replies["Porto"] = (None, "503")
+    flags = [ok for _, _, ok in AgriGuard._batch(["Lodwar", "Porto", "Berlin", "Nowhere"], max_workers=4)]
+    assert flags == [True, False, False, False]
+
+
+class FakeSMS:
+    def __init__(self):
+        self.sent = []
+
+    def send_bulk(self, numbers, body):
+        self.sent.append((numbers, body))
+        return [(n, True, "SM1") for n in numbers]
+
+
+def test_run_many_texts_only_real_advice(pipeline):
+    pipeline.failing_forecasts.add("Berlin")
+    pipeline.replies["Porto"] = (None, "503")
+    sms = FakeSMS()
+    recipients = {city: [f"+1415555010{i}"] for i, city in enumerate(["Lodwar", "Porto", "Berlin", "Nowhere"])}
+
+    runs, skipped = AgriGuard.run_many(["Lodwar", "Porto", "Berlin", "Nowhere"], sms=sms, recipients=recipients)
+
+    assert sms.sent == [(["+14155550100"], "\n".join(ADVICE))]
+    assert [sent for _, _, sent in runs] == [[("+14155550100", True, "SM1")], [], [], []]
+    assert skipped == {
+        "Porto": "⚠️ AI advice unavailable: 503",
+        "Berlin": "⚠️ Forecast unavailable.",
+        "Nowhere": "Location Error",
+    }
+
+
+def test_run_many_skipped_lists_only_cities_with_recipients(pipeline):
+    pipeline.replies["Porto"] = (None, "503")
+    sms = FakeSMS()
+    runs, skipped = AgriGuard.run_many(["Lodwar", "Porto"], sms=sms, recipients={"Lodwar": ["+14155550100"]})
+
+    assert [advice for _, advice, _ in runs] == [ADVICE, ["⚠️ AI advice unavailable: 503"]]
+    assert skipped == {}
+    assert len(sms.sent) == 1
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from agriguard import geocode as geocode_mod
+from agriguard.geocode import _load_cache, geocode
+
+PORTO = {"name": "Porto", "country": "Portugal", "latitude": 41.14961, "longitude": -8.61099}
+NAIROBI = {"name": "Nairobi", "country": "Kenya", "latitude": -1.28333, "longitude": 36.81667}
+
+
+class FakeSession:
+    """Stands in for retry_session: answers every search with results, recording the names asked for."""
+
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    def get(self, url, params, timeout):
+        self.queries.append(params["name"])
+        return type("Response", (), {"json": lambda _: {"results": self.results}})()
+
+
+@pytest.fixture
+def cache_file(tmp_path, monkeypatch):
+    path = tmp_path / ".geocode.json"
+    monkeypatch.setattr(geocode_mod, "_GEOCODE_PATH", str(path))
+    return path
+
+
+@pytest.fixture
+def session(monkeypatch):
+    fake = FakeSession([NAIROBI])
+    monkeypatch.setattr(geocode_mod, "retry_session", fake)
+    return fake
+
+
+def use_cache(monkeypatch):
+    monkeypatch.setattr(geocode_mod, "_GEOCODE_CACHE", _load_cache())
+
+
+def test_seeded_city_needs_no_request(cache_file, session, monkeypatch):
+    use_cache(monkeypatch)
+    assert geocode("  London ", verbose=False) == (51.50853, -0.12574)
+    assert session.queries == []
+
+
+def test_lookup_is_persisted_and_reloaded(cache_file, session, monkeypatch):
+    use_cache(monkeypatch)
+    assert geocode("Nairobi", verbose=False) == (-1.28333, 36.81667)
+    assert json.loads(cache_file.read_text())["nairobi"] == NAIROBI
+
+    # A fresh process reads it back and skips the request
+    use_cache(monkeypatch)
+    assert geocode("nairobi", verbose=False) == (-1.28333, 36.81667)
+    assert session.queries == ["Nairobi"]
+
+
+@pytest.mark.parametrize("content", ["{not json", "[]", '"porto"', "null"])
+def test_unreadable_file_falls_back_to_seed(cache_file, content):
+    cache_file.write_text(content)
+    assert _load_cache() == geocode_mod._GEOCODE_SEED
+
+
+def test_malformed_entries_are_dropped(cache_file):
+    cache_file.write_text(
+        json.dumps(
+            {
+                "nairobi": NAIROBI,
+                "porto": {**PORTO, "latitude": 0.0},
+                "oslo": ["Oslo", 59.9, 10.7],
+                "lima": {"name": "Lima", "country": "Peru", "latitude": -12.0},
+                "kano": {"name": "Kano", "country": "Nigeria", "latitude": "12", "longitude": 8.5},
+            }
+        )
+    )
+    cache = _load_cache()
+    assert cache["nairobi"] == NAIROBI
+    assert cache["porto"]["latitude"] == 0.0
+    assert not {"oslo", "lima", "kano"} & cache.keys()
+
+
+def test_bad_entry_is_looked_up_again(cache_file, session, monkeypatch):
+    cache_file.write_text(json.dumps({"nairobi": {"name": "Nairobi"}}))
+    use_cache(monkeypatch)
+    assert geocode("Nairobi", verbose=False) == (-1.28333, 36.81667)
+    assert session.queries == ["Nairobi"]
@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+
+import pytest
+
+from outbound import outbound
+from outbound.outbound import SMSClient, _TokenBucket, segment_count
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Fake monotonic clock; time.sleep advances it instead of blocking. Tests use rate 4 so
+    every 1/rate step is exact in binary floating point.
+    """
+    state = SimpleNamespace(now=0.0)
+
+    def sleep(seconds):
+        state.now += seconds
+
+    # Replace the module's time reference, not the global time functions threading relies on
+    monkeypatch.setattr(outbound, "time", SimpleNamespace(monotonic=lambda: state.now, sleep=sleep))
+    return state
+
+
+@pytest.fixture
+def sms(clock, monkeypatch):
+    client = SMSClient("ACtest", "token", "+14155550100", rate_per_sec=4)
+    client.sent = []
+
+    def create(to, body):
+        if to.endswith("9999"):
+            raise RuntimeError("Twilio error")
+        client.sent.append(to)
+        return SimpleNamespace(sid=f"SM{to[-4:]}")
+
+    monkeypatch.setattr(client, "_create", create)
+    return client
+
+
+def test_token_bucket_spaces_acquisitions(clock):
+    bucket = _TokenBucket(rate=4)
+    for _ in range(5):
+        bucket.acquire()
+    # First token is available immediately, then one every 0.25 s
+    assert clock.now == 1.0
+
+
+def test_token_bucket_does_not_burst_after_idle(clock):
+    bucket = _TokenBucket(rate=4)
+    bucket.acquire()
+    clock.now = 60.0
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.now == 60.25
+
+
+def test_send_bulk_rate_limit_spans_calls(sms, clock):
+    for n in range(3):
+        sms.send_bulk([f"+1415555010{n}"], "hi")
+    assert clock.now == 0.5
+
+
+def test_send_bulk_reports_per_number_failures(sms):
+    assert sms.send_bulk(["+14155550101", "+14155559999"], "hi") == [
+        ("+14155550101", True, "SM0101"),
+        ("+14155559999", False, "Twilio error"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        ("", 1),
+        ("a" * 160, 1),
+        ("a" * 161, 2),
+        ("a" * 306, 2),
+        ("a" * 307, 3),
+        # Extension characters take two septets
+        ("€" * 80, 1),
+        ("€" * 81, 2),
+        ("a" * 159 + "[", 2),
+        # Any non-GSM-7 character switches the whole body to UCS-2
+        ("а" * 70, 1),
+        ("а" * 71, 2),
+        ("а" * 134, 2),
+        ("а" * 135, 3),
+        ("a" * 69 + "ç", 1),
+        ("a" * 70 + "ç", 2),
+        # Astral characters (emoji) are two UTF-16 code units
+        ("🌾" * 35, 1),
+        ("🌾" * 36, 2),
+    ],
+)
+def test_segment_count(body, expected):
+    assert segment_count(body) == expected
+
+
+def test_send_bulk_rejects_invalid_numbers_locally(sms):
+    assert sms.send_bulk(["+14155550101", "not a number", "+1234"], "hi") == [
+        ("+14155550101", True, "SM0101"),
+        ("not a number", False, "Invalid E.164 phone number"),
+        ("+1234", False, "Invalid E.164 phone number"),
+    ]
+    assert sms.sent == ["+14155550101"]
+
+
+def test_send_bulk_rejects_long_body_without_sending(sms):
+    assert sms.send_bulk(["+14155550101"], "a" * 1601) == [
+        ("+14155550101", False, "Body exceeds 1600 characters"),
+    ]
+    assert sms.sent == []
+
+
+def test_multi_segment_body_warns(sms):
+    with pytest.warns(UserWarning, match="2 segments"):
+        sms.send_bulk(["+14155550101"], "a" * 161)
+
+
+def test_send_sms_raises_on_invalid_number(sms):
+    with pytest.raises(ValueError, match="Invalid E.164"):
+        sms.send_sms("12345", "hi")
+    assert sms.sent == []
+
+
+def test_send_bulk_dedupes_by_e164_and_keeps_order(sms):
+    numbers = ["+14155550101", "+1 415-555-0101", "+14155550102", "+1 (415) 555-0102"]
+    assert sms.send_bulk(numbers, "hi") == [
+        ("+14155550101", True, "SM0101"),
+        ("+1 415-555-0101", True, "SM0101"),
+        ("+14155550102", True, "SM0102"),
+        ("+1 (415) 555-0102", True, "SM0102"),
+    ]
+    assert sorted(sms.sent) == ["+14155550101", "+14155550102"]
@@ -1,7 +1,7 @@
-import deepl
-
 class Translator():
     def __init__(self, auth_key: str):
+        import deepl  # deferred to keep import time down
+
         self.client = deepl.DeepLClient(auth_key)
 
     def translate(self, message: str, target_lang: str='DE'):